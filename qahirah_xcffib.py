@@ -6,39 +6,52 @@ with the xcffib binding.
 # Licensed under the GNU Lesser General Public License v2.1 or later.
 #-
 
+from weakref import \
+    WeakKeyDictionary
 import qahirah
 import cffi
 import xcffib
 from xcffib import \
-    xproto, \
-    render as xrender
+    xproto
+  # other extension modules, like xcffib.render, are only referred to by
+  # name below, so they need not be loaded just by importing this module
 
 assert qahirah.HAS.XCB_SURFACE, "Cairo is missing XCB support"
 
 _ffi = cffi.FFI()
 _ffi_size_t = _ffi.typeof("size_t")
+_conn_addrs = WeakKeyDictionary()
+  # cache of (xcffib.Connection._conn, raw address) pairs, keyed by xcffib.Connection
 
 def def_xcffib_subclass(base_class, xcffib_module, xcffib_name, substructs = None) :
     # defines a subclass of base_class that adds an ensure_struct
-    # method for converting from the xcffib wrapper objects.
+    # method for converting from the xcffib wrapper objects. xcffib_module
+    # is the name of the xcffib module defining xcffib_name.
 
     name = base_class.__name__
+    # work out once which fields to copy, rather than on every conversion
+    field_names = tuple \
+      (
+        field_name
+        for field_name, cttype in base_class._ctstruct._fields_
+        if base_class._ignore is None or field_name not in base_class._ignore
+      )
+    if substructs is not None :
+        substructs = tuple(substructs.items())
+    else :
+        substructs = ()
+    #end if
 
     class result_class(base_class) :
 
+        __slots__ = () # to forestall typos
+
         def ensure_struct(celf, s) :
             if not isinstance(s, base_class) :
-                fields = dict \
-                  (
-                    (name, getattr(s, name))
-                    for name, cttype in celf._ctstruct._fields_
-                    if celf._ignore == None or name not in celf._ignore
-                  )
-                if substructs != None :
-                    for field_name, field_type in substructs.items() :
-                        fields[field_name] = field_type.ensure_struct(fields[field_name])
-                    #end for
-                #end if
+                fields = {field_name : getattr(s, field_name) for field_name in field_names}
+                for field_name, field_type in substructs :
+                    fields[field_name] = field_type.ensure_struct(fields[field_name])
+                #end for
                 s = celf(**fields)
             #end if
             return \
@@ -46,10 +59,10 @@ def def_xcffib_subclass(base_class, xcffib_module, xcffib_name, substructs = Non
         #end ensure_struct
         ensure_struct.__doc__ = \
             (
-                    "accepts either a %s xcffib object or one of this %s class;"
+                    "accepts either an xcffib.%s.%s object or one of this %s class;"
                     " converts the former to the latter, and returns the latter unchanged."
                 %
-                    (xcffib_name, name)
+                    (xcffib_module, xcffib_name, name)
             )
           # interesting that this can’t be assigned after class definition has finished,
           # and that setting it is ignored after applying classmethod decorator.
@@ -73,25 +86,25 @@ def def_xcffib_subclass(base_class, xcffib_module, xcffib_name, substructs = Non
 XCBVisualType = def_xcffib_subclass \
   (
     base_class = qahirah.XCBVisualType,
-    xcffib_module = xproto,
+    xcffib_module = "xproto",
     xcffib_name = "VISUALTYPE"
   )
 XCBRenderDirectFormat = def_xcffib_subclass \
   (
     base_class = qahirah.XCBRenderDirectFormat,
-    xcffib_module = xproto,
+    xcffib_module = "render",
     xcffib_name = "DIRECTFORMAT"
   )
 XCBScreen = def_xcffib_subclass \
   (
     base_class = qahirah.XCBScreen,
-    xcffib_module = xproto,
+    xcffib_module = "xproto",
     xcffib_name = "SCREEN"
   )
 XCBRenderPictFormInfo = def_xcffib_subclass \
   (
     base_class = qahirah.XCBRenderPictFormInfo,
-    xcffib_module = xrender,
+    xcffib_module = "render",
     xcffib_name = "PICTFORMINFO",
     substructs = {"direct" : XCBRenderDirectFormat}
   )
@@ -108,11 +121,28 @@ class XCBSurface(qahirah.XCBSurface) :
     def _get_conn(connection) :
         "gets the raw xcb_connection_t address from the xcffib.Connection object." \
         " Will this continue to work reliably in future? Who knows..."
-        if not hasattr(connection, "_conn") :
+        try :
+            xcb_conn = connection._conn
+        except AttributeError :
             raise TypeError("connection does not have a _conn attribute")
+        #end try
+        try :
+            entry = _conn_addrs.get(connection)
+            cacheable = True
+        except TypeError :
+            # connection cannot be weakly referenced or hashed, so don’t cache
+            entry = None
+            cacheable = False
+        #end try
+        if entry is None or entry[0] is not xcb_conn :
+            # first time, or its _conn has been replaced since
+            entry = (xcb_conn, int(_ffi.cast(_ffi_size_t, xcb_conn)))
+            if cacheable :
+                _conn_addrs[connection] = entry
+            #end if
         #end if
         return \
-            int(_ffi.cast(_ffi_size_t, connection._conn))
+            entry[1]
     #end _get_conn
 
     @classmethod
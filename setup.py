@@ -17,15 +17,10 @@ class my_build(std_build) :
     "customization of build to perform additional validation."
 
     def run(self) :
-        try :
-            class dummy :
-                pass
-            #end dummy
-            dummy.__doc__ = "something"
-        except AttributeError :
+        if sys.version_info < (3, 3) :
             sys.stderr.write("This module requires Python 3.3 or later.\n")
             sys.exit(-1)
-        #end try
+        #end if
         super().run()
     #end run
 